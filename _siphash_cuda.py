@@ -0,0 +1,61 @@
+"""
+SipHash-2-4 CUDA kernel, imported by siphash._load_cuda on first use.
+"""
+from numba import cuda, uint64
+from util import sipround_uint64
+
+
+_sipround_cuda = cuda.jit(device=True)(sipround_uint64)
+
+
+@cuda.jit
+def siphash24_kernel(k0, k1, msg_offsets, msg_bytes, out):
+    """
+    SipHash-2-4 of every message, one thread per message.
+
+    Parameters
+    ----------
+    k0 : uint64
+        8-byte k0
+    k1 : uint64
+        8-byte k1
+    msg_offsets : int64[:]
+        Start of every message in msg_bytes, followed by the total length
+    msg_bytes : uint8[:]
+        All messages concatenated
+    out : uint64[:]
+        SipHash result of every message
+    """
+    i = cuda.grid(1)
+    if i >= out.size:
+        return
+    start = msg_offsets[i]
+    message_length = msg_offsets[i + 1] - start
+
+    v0 = k0 ^ uint64(0x736f6d6570736575)
+    v1 = k1 ^ uint64(0x646f72616e646f6d)
+    v2 = k0 ^ uint64(0x6c7967656e657261)
+    v3 = k1 ^ uint64(0x7465646279746573)
+
+    end = message_length - message_length % 8
+    for j in range(0, end, 8):
+        word = uint64(0)
+        for b in range(8):
+            word |= uint64(msg_bytes[start + j + b]) << uint64(8 * b)
+        v3 ^= word
+        v0, v1, v2, v3 = _sipround_cuda(v0, v1, v2, v3)
+        v0, v1, v2, v3 = _sipround_cuda(v0, v1, v2, v3)
+        v0 ^= word
+
+    word = uint64(message_length & 0xff) << uint64(56)
+    for b in range(message_length - end):
+        word |= uint64(msg_bytes[start + end + b]) << uint64(8 * b)
+    v3 ^= word
+    v0, v1, v2, v3 = _sipround_cuda(v0, v1, v2, v3)
+    v0, v1, v2, v3 = _sipround_cuda(v0, v1, v2, v3)
+    v0 ^= word
+
+    v2 ^= uint64(0xff)
+    for _ in range(4):
+        v0, v1, v2, v3 = _sipround_cuda(v0, v1, v2, v3)
+    out[i] = v0 ^ v1 ^ v2 ^ v3
@@ -0,0 +1,57 @@
+"""
+SipHash-2-4 compiled with Numba, imported by siphash._load_numba on first use.
+"""
+from numba import njit, types, uint64
+from util import sipround_uint64
+
+
+_sipround_numba = njit(cache=True)(sipround_uint64)
+
+
+@njit(uint64(uint64, uint64, types.Array(types.uint8, 1, 'C', readonly=True)), cache=True, boundscheck=False)
+def siphash24(k0, k1, msg_bytes):
+    """
+    SipHash-2-4 of a uint8 array, compiled with Numba.
+
+    Parameters
+    ----------
+    k0 : uint64
+        8-byte k0
+    k1 : uint64
+        8-byte k1
+    msg_bytes : uint8[:]
+        Message to be hashed
+
+    Returns
+    -------
+    uint64
+        SipHash result in little-endian representation
+    """
+    v0 = k0 ^ uint64(0x736f6d6570736575)
+    v1 = k1 ^ uint64(0x646f72616e646f6d)
+    v2 = k0 ^ uint64(0x6c7967656e657261)
+    v3 = k1 ^ uint64(0x7465646279746573)
+
+    message_length = len(msg_bytes)
+    end = message_length - message_length % 8
+    for i in range(0, end, 8):
+        word = uint64(0)
+        for j in range(8):
+            word |= uint64(msg_bytes[i + j]) << uint64(8 * j)
+        v3 ^= word
+        v0, v1, v2, v3 = _sipround_numba(v0, v1, v2, v3)
+        v0, v1, v2, v3 = _sipround_numba(v0, v1, v2, v3)
+        v0 ^= word
+
+    word = uint64(message_length & 0xff) << uint64(56)
+    for j in range(message_length - end):
+        word |= uint64(msg_bytes[end + j]) << uint64(8 * j)
+    v3 ^= word
+    v0, v1, v2, v3 = _sipround_numba(v0, v1, v2, v3)
+    v0, v1, v2, v3 = _sipround_numba(v0, v1, v2, v3)
+    v0 ^= word
+
+    v2 ^= uint64(0xff)
+    for _ in range(4):
+        v0, v1, v2, v3 = _sipround_numba(v0, v1, v2, v3)
+    return v0 ^ v1 ^ v2 ^ v3
@@ -1,6 +1,8 @@
 import unittest
+import unittest.mock
 import binascii
-from siphash import SipHash
+import siphash
+from siphash import SipHash, siphash24
 
 
 class TestSipHash(unittest.TestCase):
@@ -15,6 +17,10 @@ class TestSipHash(unittest.TestCase):
         k0 = 0x0706050403020100
         k1 = 0x0f0e0d0c0b0a0908
         self.assertEqual(self.siphash._encode_key(key), (k0, k1))
+        self.assertEqual(self.siphash._encode_key((1 << 128) - 1), (0xffffffffffffffff, 0xffffffffffffffff))
+        self.assertRaises(OverflowError, self.siphash._encode_key, 1 << 128)
+        self.assertRaises(OverflowError, self.siphash._encode_key, -1)
+        self.assertRaises(OverflowError, SipHash(1 << 130, b'').get_hash)
 
     def test_initialise_internal_state(self):
         v0 = 0x7469686173716475
@@ -35,9 +41,19 @@ class TestSipHash(unittest.TestCase):
         message = binascii.unhexlify(b'000102030405060708090a0b0c0d0e')
         self.assertEqual(self.siphash._compress(message, (v0, v1, v2, v3)), (v0_compression, v1_compression, v2_compression, v3_compression))
 
+    def test_compress_c2(self):
+        internal_state = (0x7469686173716475, 0x6b617f6d656e6665, 0x6b7f62616d677361, 0x7b6b696e727e6c7b)
+        words = [0x0706050403020100, 0x0f0e0d0c0b0a0908]
+        expected = (0x3c85b3ab6f55be51, 0x414fc3fb98efe374, 0xccf13ea527b9f4bd, 0x5293f5da84008f82)
+        self.assertEqual(self.siphash._compress_c2(words, internal_state), expected)
+
     def test_message_to_words(self):
         message = binascii.unhexlify(b'000102030405060708090a0b0c0d0e')
         self.assertListEqual(self.siphash._message_to_words(message), [0x0706050403020100, 0x0f0e0d0c0b0a0908])
+        self.assertListEqual(self.siphash._message_to_words(b''), [0x0000000000000000])
+        self.assertListEqual(self.siphash._message_to_words(b'\x00'), [0x0100000000000000])
+        message = binascii.unhexlify(b'0001020304050607')
+        self.assertListEqual(self.siphash._message_to_words(message), [0x0706050403020100, 0x0800000000000000])
 
     def test_sipround(self):
         v0 = 0x7469686173716475
@@ -60,6 +76,35 @@ class TestSipHash(unittest.TestCase):
         h = 0xa129ca6149be45e5
         self.assertEqual(self.siphash._finalise((v0, v1, v2, v3)), h)
 
+    def test_finalise_padding(self):
+        internal_state = self.siphash._initialise_internal_state(0x0706050403020100, 0x0f0e0d0c0b0a0908)
+        for message, h in ((b'', 0x726fdb47dd0e0e31), (b'\x00', 0x74f839c593dc67fd),
+                           (binascii.unhexlify(b'0001020304050607'), 0x93f5f5799a932462)):
+            self.assertEqual(self.siphash._finalise(self.siphash._compress(message, internal_state)), h)
+
+    def test_compress_finalise_without_sipround(self):
+        internal_state = (0x7469686173716475, 0x6b617f6d656e6665, 0x6b7f62616d677361, 0x7b6b696e727e6c7b)
+        message = binascii.unhexlify(b'000102030405060708090a0b0c0d0e')
+        for c, d in ((1, 3), (2, 4), (3, 5)):
+            siphash = SipHash(self.siphash.key, message, c, d)
+            expected = siphash._finalise(siphash._compress(message, internal_state))
+            with unittest.mock.patch.object(SipHash, '_sipround', side_effect=AssertionError):
+                self.assertEqual(siphash._finalise(siphash._compress(message, internal_state)), expected)
+
+    def test_finalise_d4(self):
+        internal_state = (0x3c85b3ab6f55be51, 0x414fc3fb98efe374, 0xccf13ea527b9f4bd, 0x5293f5da84008f82)
+        self.assertEqual(self.siphash._finalise_d4(internal_state), 0xa129ca6149be45e5)
+
+    def test_make_kernel(self):
+        k0 = 0x0706050403020100
+        k1 = 0x0f0e0d0c0b0a0908
+        self.assertEqual(siphash._make_kernel(0, 2, 4)(k0, k1, b''), 0x726fdb47dd0e0e31)
+        self.assertEqual(siphash._make_kernel(1, 2, 4)(k0, k1, b'\x00'), 0x74f839c593dc67fd)
+        self.assertEqual(siphash._make_kernel(8, 2, 4)(k0, k1, bytes(range(8))), 0x93f5f5799a932462)
+        self.assertEqual(siphash._make_kernel(15, 2, 4)(k0, k1, bytes(range(15))), 0xa129ca6149be45e5)
+        self.assertEqual(siphash._make_kernel(0, 1, 3)(k0, k1, b''), 0xabac0158050fc4dc)
+        self.assertIs(siphash._make_kernel(15, 2, 4), siphash._make_kernel(15, 2, 4))
+
     def test_get_hash(self):
         self.assertEqual(self.siphash.get_hash(), 0xa129ca6149be45e5)
 
@@ -69,6 +114,163 @@ class TestSipHash(unittest.TestCase):
 
     def test_hexdigest(self):
         self.assertEqual(self.siphash.hexdigest(), 'a129ca6149be45e5')
+        siphash = SipHash(self.siphash.key, b'')
+        siphash.hash = 0x00000000000000ff
+        self.assertEqual(siphash.hexdigest(), '00000000000000ff')
+
+    def test_update_digest(self):
+        siphash = SipHash(self.siphash.key, b'\x00\x01\x02')
+        siphash.update(b'')
+        siphash.update(binascii.unhexlify(b'030405060708090a'))
+        self.assertEqual(len(siphash._tail), 3)
+        siphash.update(binascii.unhexlify(b'0b0c0d0e'))
+        self.assertEqual(siphash.digest(), 0xa129ca6149be45e5)
+        self.assertEqual(siphash.hexdigest(), 'a129ca6149be45e5')
+        siphash = SipHash(self.siphash.key)
+        for i in range(15):
+            siphash.update(bytearray([i]))
+            self.assertLess(len(siphash._tail), 8)
+        self.assertEqual(siphash.digest(), 0xa129ca6149be45e5)
+        siphash = SipHash(self.siphash.key)
+        self.assertEqual(siphash.digest(), 0x726fdb47dd0e0e31)
+        siphash.update(binascii.unhexlify(b'0001020304050607'))
+        self.assertEqual(siphash.digest(), 0x93f5f5799a932462)
+
+    def test_update_after_get_hash(self):
+        streamed = SipHash(self.siphash.key, b'\x00\x01\x02')
+        streamed.get_hash()
+        if siphash.np:
+            streamed.get_hash_tree()
+        streamed.update(binascii.unhexlify(b'030405060708090a0b0c0d0e'))
+        self.assertIsNone(streamed.hash)
+        self.assertIsNone(streamed.tree_hash)
+        self.assertEqual(streamed.get_hash(), 0xa129ca6149be45e5)
+        self.assertEqual(streamed.hash, 0xa129ca6149be45e5)
+        self.assertRaises(ValueError, streamed.get_hash_tree)
+
+    def test_siphash24(self):
+        siphash24.cache_clear()
+        self.assertEqual(siphash24(self.siphash.key, self.siphash.message), 0xa129ca6149be45e5)
+        self.assertEqual(siphash24(self.siphash.key, self.siphash.message), 0xa129ca6149be45e5)
+        self.assertEqual(siphash24.cache_info().hits, 1)
+
+    def test_fast(self):
+        siphash13 = SipHash.fast(self.siphash.key, b'')
+        self.assertEqual((siphash13.c, siphash13.d), (1, 3))
+        self.assertEqual(siphash13.get_hash(), 0xabac0158050fc4dc)
+        internal_state = siphash13._initialise_internal_state(0x0706050403020100, 0x0f0e0d0c0b0a0908)
+        self.assertEqual(siphash13._finalise(siphash13._compress(b'', internal_state)), 0xabac0158050fc4dc)
+
+    def test_hash_many(self):
+        key = 0x000102030405060708090a0b0c0d0e0f
+        messages = [bytes(range(n)) for n in range(20)] + [bytes(range(15))] * 3
+        expected = [SipHash(key, message).get_hash() for message in messages]
+        self.assertListEqual(SipHash.hash_many(key, messages), expected)
+        expected = [SipHash(key, message, 1, 3).get_hash() for message in messages]
+        self.assertListEqual(SipHash.hash_many(key, messages, 1, 3), expected)
+
+    @unittest.skipUnless(siphash.np, 'numpy is not installed')
+    def test_hash_many_numpy_lanes(self):
+        key = 0x000102030405060708090a0b0c0d0e0f
+        messages = [bytes(range(i, i + 12)) for i in range(siphash._MIN_NUMPY_LANES + 3)] + [b'', b'\x00']
+        for c, d in ((2, 4), (1, 3)):
+            expected = [SipHash(key, message, c, d).get_hash() for message in messages]
+            with unittest.mock.patch.object(siphash, '_load_native', return_value=None), \
+                    unittest.mock.patch.object(SipHash, '_hash_lanes', wraps=SipHash._hash_lanes) as hash_lanes:
+                self.assertListEqual(SipHash.hash_many(key, messages, c, d), expected)
+            hash_lanes.assert_called_once()
+
+    @unittest.skipUnless(siphash.np, 'numpy is not installed')
+    def test_sipround_lanes(self):
+        internal_state = (0x7469686173716475, 0x6b617f6d656e6665, 0x6b7f62616d677361, 0x7c6d6c6a717c6d7b)
+        lanes = [siphash.np.full(4, v, dtype=siphash.np.uint64) for v in internal_state]
+        lanes = SipHash._sipround_lanes(*lanes)
+        expected = self.siphash._sipround(internal_state)
+        for lane, v in zip(lanes, expected):
+            self.assertListEqual([int(x) for x in lane], [v] * 4)
+
+    @unittest.skipUnless(siphash.np, 'numpy is not installed')
+    def test_get_hash_tree(self):
+        tree_hash = self.siphash.get_hash_tree()
+        self.assertEqual(self.siphash.tree_hash, tree_hash)
+        self.assertNotEqual(tree_hash, self.siphash.get_hash())
+        for length, h in ((0, 0x2f958e4dc6690f2d), (31, 0x199949b39a767f08),
+                          (32, 0x5ac58d83a86769f5), (33, 0xbf970b702fa08543)):
+            self.assertEqual(SipHash(self.siphash.key, bytes(range(length))).get_hash_tree(), h)
+
+    @unittest.skipUnless(siphash.np, 'numpy is not installed')
+    def test_get_hash_tree_lanes(self):
+        message = bytes(range(59))
+        words = [int.from_bytes(message[i:i + 8], 'little') for i in range(0, 56, 8)]
+        words.append(int.from_bytes(message[56:], 'little') | 59 << 56)
+        lanes = b''
+        for lane in range(4):
+            v0, v1, v2, v3 = self.siphash._initialise_internal_state(0x0706050403020100, 0x0f0e0d0c0b0a0908)
+            v1 ^= lane
+            for word in words[lane::4]:
+                v3 ^= word
+                v0, v1, v2, v3 = self.siphash._sipround(self.siphash._sipround((v0, v1, v2, v3)))
+                v0 ^= word
+            v2 ^= 0xff
+            for _ in range(4):
+                v0, v1, v2, v3 = self.siphash._sipround((v0, v1, v2, v3))
+            lanes += (v0 ^ v1 ^ v2 ^ v3).to_bytes(8, 'little')
+        expected = SipHash(self.siphash.key, lanes).get_hash()
+        self.assertEqual(SipHash(self.siphash.key, message).get_hash_tree(), expected)
+
+@unittest.skipUnless(siphash._load_native(), '_siphash.so has not been built')
+class TestNativeSipHash(unittest.TestCase):
+
+    def test_siphash24(self):
+        native = siphash._load_native()
+        k0 = 0x0706050403020100
+        k1 = 0x0f0e0d0c0b0a0908
+        self.assertEqual(native.siphash24(k0, k1, b'', 0), 0x726fdb47dd0e0e31)
+        self.assertEqual(native.siphash24(k0, k1, b'\x00', 1), 0x74f839c593dc67fd)
+        self.assertEqual(native.siphash24(k0, k1, bytes(range(8)), 8), 0x93f5f5799a932462)
+        self.assertEqual(native.siphash24(k0, k1, bytes(range(15)), 15), 0xa129ca6149be45e5)
+
+    def test_hash_lanes_native(self):
+        native = siphash._load_native()
+        key = 0x000102030405060708090a0b0c0d0e0f
+        for messages in ([b'', b'\x00', bytes(range(7)), b'\xff' * 3],
+                         [bytes(range(15)), bytes(range(8)), bytes(range(1, 12)), bytes(range(2, 10))],
+                         [b'', bytes(range(8)), bytes(range(15)), bytes(range(17))],
+                         [bytes(range(i, i + 9)) for i in range(7)], [b'\x00'], []):
+            expected = [siphash24(key, message) for message in messages]
+            self.assertListEqual(SipHash._hash_lanes_native(native, key, messages), expected)
+
+
+@unittest.skipUnless(siphash._load_numba(), 'numba is not installed')
+class TestNumbaSipHash(unittest.TestCase):
+
+    def test_siphash24_numba(self):
+        kernel = siphash._load_numba()
+        np = siphash.np
+        k0 = 0x0706050403020100
+        k1 = 0x0f0e0d0c0b0a0908
+        self.assertEqual(kernel(k0, k1, np.frombuffer(b'', dtype=np.uint8)), 0x726fdb47dd0e0e31)
+        self.assertEqual(kernel(k0, k1, np.frombuffer(b'\x00', dtype=np.uint8)), 0x74f839c593dc67fd)
+        self.assertEqual(kernel(k0, k1, np.frombuffer(bytes(range(8)), dtype=np.uint8)), 0x93f5f5799a932462)
+        self.assertEqual(kernel(k0, k1, np.frombuffer(bytes(range(15)), dtype=np.uint8)), 0xa129ca6149be45e5)
+
+
+def _cuda_available():
+    if siphash._load_cuda() is None:
+        return False
+    from numba import cuda
+    return cuda.is_available()
+
+
+@unittest.skipUnless(_cuda_available(), 'CUDA is not available')
+class TestCudaSipHash(unittest.TestCase):
+
+    def test_hash_many_cuda(self):
+        key = 0x000102030405060708090a0b0c0d0e0f
+        messages = [bytes(range(n)) for n in range(20)]
+        expected = [SipHash(key, message).get_hash() for message in messages]
+        self.assertListEqual(SipHash.hash_many_cuda(key, messages), expected)
+        self.assertListEqual(SipHash.hash_many_cuda(key, []), [])
 
 if __name__ == '__main__':
     unittest.main()
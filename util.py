@@ -2,6 +2,8 @@ def big_to_little8(num: int) -> int:
     """
     Convert 8-byte big endian integer to little endian integer to work with bitwise operations.
 
+    Bytes are swapped with masks and shifts, without going through a bytes object.
+
     Parameters
     ----------
     num : int
@@ -12,9 +14,11 @@ def big_to_little8(num: int) -> int:
     int
         Converted integer
     """
-    return int.from_bytes(num.to_bytes(8, 'big'), 'little')
+    num = ((num & 0x00ff00ff00ff00ff) << 8) | ((num >> 8) & 0x00ff00ff00ff00ff)
+    num = ((num & 0x0000ffff0000ffff) << 16) | ((num >> 16) & 0x0000ffff0000ffff)
+    return ((num & 0xffffffff) << 32) | (num >> 32)
 
-def rotl8(num: int, bits: int) -> int:
+def rotl8(num: int, bits: int, _M=0xffffffffffffffff) -> int:
     """
     Bitwise left-rotate of a 8-byte number.
 
@@ -30,4 +34,37 @@ def rotl8(num: int, bits: int) -> int:
     int
         Left-rotated number
     """
-    return ((num << bits) & 0xffffffffffffffff) | (num >> (64 - bits))
+    return ((num << bits) & _M) | (num >> (64 - bits))
+
+def sipround_uint64(v0, v1, v2, v3):
+    """
+    SipRound on fixed-width unsigned 64-bit values, to be compiled by Numba for the CPU or CUDA.
+
+    Additions and left shifts rely on uint64 wrap-around instead of masking,
+    so the result is wrong for Python ints.
+
+    Parameters
+    ----------
+    v0, v1, v2, v3 : uint64
+        Internal state v0, v1, v2, v3
+
+    Returns
+    -------
+    (uint64, uint64, uint64, uint64)
+        Internal state v0, v1, v2, v3 after SipRound transform
+    """
+    v0 += v1
+    v1 = (v1 << 13) | (v1 >> 51)
+    v1 ^= v0
+    v0 = (v0 << 32) | (v0 >> 32)
+    v2 += v3
+    v3 = (v3 << 16) | (v3 >> 48)
+    v3 ^= v2
+    v2 += v1
+    v1 = (v1 << 17) | (v1 >> 47)
+    v1 ^= v2
+    v2 = (v2 << 32) | (v2 >> 32)
+    v0 += v3
+    v3 = (v3 << 21) | (v3 >> 43)
+    v3 ^= v0
+    return v0, v1, v2, v3